@@ -0,0 +1,1063 @@
+"""
+Benchmarks for the Munder Difflin database and reporting functions.
+
+Each benchmark builds a throwaway SQLite database next to the CSV inputs,
+grows it to the requested size with synthetic data, and times the current
+implementation against the implementation it replaced.
+
+Usage:
+    python benchmarks.py report --items 1000 --sales 20000
+    python benchmarks.py writes --rows 2000
+    python benchmarks.py search --quotes 1000000
+    python benchmarks.py pipeline --workers 1 2 4 8
+    python benchmarks.py matcher
+    python benchmarks.py startup --repeat 10
+    python benchmarks.py cache --passes 3
+    python benchmarks.py models --requests 200 --concurrency 1 8 32
+    python benchmarks.py suite --skus 1000 10000 --transactions 10000 1000000 --output bench.json
+    python benchmarks.py suite --compare bench.json
+    python benchmarks.py metrics
+    python benchmarks.py pricing --quotes 100000
+    python benchmarks.py init --copies 5000
+    python benchmarks.py asof --items 1000 --sales 100000
+"""
+import argparse
+import ast
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+# The benchmarks never talk to the model API
+os.environ.setdefault("UDACITY_OPENAI_API_KEY", "benchmark")
+
+import project_starter as ps
+from stub_server import start_stub_server
+
+
+def time_call(fn: Callable, repeat: int = 5) -> float:
+    """Return the best wall-clock time in seconds over `repeat` calls of `fn`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def sample_calls(fn: Callable, repeat: int = 5) -> Dict:
+    """Call `fn(i)` for i in range(`repeat`) and summarize the wall-clock times in milliseconds."""
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "calls": repeat,
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(float(np.percentile(timings, 95)), 4),
+    }
+
+
+def build_database(num_items: int, num_sales: int, seed: int = 137, restock_share: float = 0.0,
+                   chunk_size: int = 500_000):
+    """
+    Create a temporary database seeded by `init_database` and grown synthetically.
+
+    `num_items` extra catalog items are added to the inventory table with starting
+    stock, then `num_sales` transactions spread over the first quarter of 2025 are
+    recorded against random items, `restock_share` of them as stock orders.
+    Transactions are generated and inserted `chunk_size` rows at a time, so the
+    ledger can grow to millions of rows in bounded memory.
+
+    Returns:
+        Engine: A SQLAlchemy engine bound to the temporary database.
+    """
+    db_path = os.path.join(tempfile.mkdtemp(prefix="munder_bench_"), "bench.db")
+    engine = ps.create_db_engine(f"sqlite:///{db_path}")
+    ps.db_engine = engine
+    ps.init_database(engine, seed=seed)
+
+    rng = np.random.default_rng(seed)
+    initial_date = "2025-01-01T00:00:00"
+
+    items = pd.DataFrame({
+        "item_name": [f"Synthetic item {i}" for i in range(num_items)],
+        "category": "synthetic",
+        "unit_price": rng.integers(1, 300, num_items) / 100,
+        "current_stock": rng.integers(200, 800, num_items),
+        "min_stock_level": rng.integers(50, 150, num_items),
+    })
+    items.to_sql("inventory", engine, if_exists="append", index=False)
+
+    stock_orders = pd.DataFrame({
+        "item_name": items["item_name"],
+        "transaction_type": "stock_orders",
+        "units": items["current_stock"],
+        "price": items["current_stock"] * items["unit_price"],
+        "transaction_date": initial_date,
+    })
+    stock_orders.to_sql("transactions", engine, if_exists="append", index=False)
+
+    names = items["item_name"].to_numpy()
+    prices = items["unit_price"].to_numpy()
+    for offset in range(0, num_sales if num_items else 0, chunk_size):
+        size = min(chunk_size, num_sales - offset)
+        sold = rng.integers(0, num_items, size)
+        restock = rng.random(size) < restock_share
+        units = np.where(restock, rng.integers(20, 100, size), rng.integers(1, 5, size))
+        days = pd.Timestamp("2025-01-02") + pd.to_timedelta(rng.integers(0, 89, size), unit="D")
+        pd.DataFrame({
+            "item_name": names[sold],
+            "transaction_type": np.where(restock, "stock_orders", "sales"),
+            "units": units,
+            "price": units * prices[sold],
+            "transaction_date": days.strftime("%Y-%m-%d"),
+        }).to_sql("transactions", engine, if_exists="append", index=False, chunksize=50000)
+    ps.rebuild_ledgers(engine)
+    return engine
+
+
+def legacy_generate_financial_report(as_of_date: str) -> Dict:
+    """The original per-item (N+1) financial report, kept as the benchmark baseline."""
+    cash = ps.get_cash_balance(as_of_date)
+
+    inventory_df = pd.read_sql("SELECT * FROM inventory", ps.db_engine)
+    inventory_value = 0.0
+    inventory_summary = []
+    for _, item in inventory_df.iterrows():
+        stock_info = ps.get_stock_level(item["item_name"], as_of_date)
+        stock = stock_info["current_stock"].iloc[0]
+        item_value = stock * item["unit_price"]
+        inventory_value += item_value
+        inventory_summary.append({
+            "item_name": item["item_name"],
+            "stock": stock,
+            "unit_price": item["unit_price"],
+            "value": item_value,
+        })
+
+    top_sales_query = """
+        SELECT item_name, SUM(units) as total_units, SUM(price) as total_revenue
+        FROM transactions
+        WHERE transaction_type = 'sales' AND transaction_date <= :date
+        GROUP BY item_name
+        ORDER BY total_revenue DESC
+        LIMIT 5
+    """
+    top_sales = pd.read_sql(top_sales_query, ps.db_engine, params={"date": as_of_date})
+
+    return {
+        "as_of_date": as_of_date,
+        "cash_balance": cash,
+        "inventory_value": inventory_value,
+        "total_assets": cash + inventory_value,
+        "inventory_summary": inventory_summary,
+        "top_selling_products": top_sales.to_dict(orient="records"),
+    }
+
+
+def suite_case(skus: int, transactions: int, quotes: int, repeat: int, seed: int = 137) -> list:
+    """
+    Build one synthetic database and time the ledger, reporting and quoting functions on it.
+
+    Read-only functions are timed first; `create_transaction` runs last, writing
+    back-dated sales so each call also pays for shifting the later ledger days.
+
+    Returns:
+        list: One result dict per function, tagged with the dataset sizes.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        build_database(skus, transactions, seed=seed, restock_share=0.1)
+        if quotes:
+            with ps.db_engine.begin() as conn:
+                ps.drop_quote_search_index(conn)
+            add_synthetic_quotes(quotes, seed=seed)
+            ps.rebuild_quote_search_index(ps.db_engine)
+        build_s = time.perf_counter() - start
+
+        rng = np.random.default_rng(seed)
+        names = pd.read_sql("SELECT item_name FROM inventory", ps.db_engine)["item_name"].to_numpy()
+        items = names[rng.integers(0, len(names), repeat)]
+        days = [f"2025-{month:02d}-{day:02d}" for month, day in zip(rng.integers(1, 4, repeat), rng.integers(1, 29, repeat))]
+        terms = [["glossy paper"], ["cardstock", "party"], ["a4 paper"], ["washi tape"]]
+
+        timed = {
+            "get_stock_level": lambda i: ps.get_stock_level(items[i], days[i]),
+            "get_all_inventory": lambda i: ps.get_all_inventory(days[i]),
+            "get_cash_balance": lambda i: ps.get_cash_balance(days[i]),
+            "generate_financial_report": lambda i: ps.generate_financial_report(days[i]),
+            "search_quote_history": lambda i: ps.search_quote_history(terms[i % len(terms)]),
+            "create_transaction": lambda i: ps.create_transaction(items[i], "sales", 1, 1.0, days[i]),
+        }
+        results = []
+        for function, fn in timed.items():
+            fn(0)  # warm the page cache and the schema check
+            results.append({
+                "function": function,
+                "skus": skus,
+                "transactions": transactions,
+                "quotes": quotes,
+                "build_s": round(build_s, 2),
+                **sample_calls(fn, repeat),
+            })
+    return results
+
+
+def git_revision() -> str:
+    """Short hash of the checked-out commit, with "-dirty" for uncommitted changes, or "unknown"."""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> int:
+    """
+    Print the median-time ratio of every case present in both result files.
+
+    Returns:
+        int: The number of cases slower than the baseline by more than `threshold`.
+    """
+    def key(result):
+        return result["function"], result["skus"], result["transactions"], result["quotes"]
+
+    before = {key(result): result for result in baseline["results"]}
+    regressions = 0
+    print(f"\nvs {baseline['meta']['revision']} (regression threshold {threshold:.0%})")
+    for result in current["results"]:
+        old = before.get(key(result))
+        if old is None:
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"  {result['function']:<26} {result['skus']:>7,} SKUs {result['transactions']:>11,} tx"
+              f"   {old['median_ms']:9.3f} -> {result['median_ms']:9.3f} ms   x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def bench_suite(args) -> None:
+    """
+    Time the ledger, reporting and quoting functions over a grid of synthetic
+    catalog and ledger sizes, writing JSON that can be compared between commits.
+    """
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "sqlalchemy": ps.sa.__version__,
+            "pandas": pd.__version__,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+    # Time the queries themselves; repeated calls would otherwise be point-in-time cache hits
+    ps.point_in_time_cache.enabled = False
+    for skus in args.skus:
+        for transactions in args.transactions:
+            print(f"{skus:,} SKUs, {transactions:,} transactions, {args.quotes:,} quotes")
+            for result in suite_case(skus, transactions, args.quotes, args.repeat, args.seed):
+                report["results"].append(result)
+                print(f"  {result['function']:<26} median {result['median_ms']:10.3f} ms"
+                      f"   p95 {result['p95_ms']:10.3f} ms")
+    ps.point_in_time_cache.enabled = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), report, args.threshold)
+        if regressions:
+            sys.exit(f"{regressions} case(s) regressed by more than {args.threshold:.0%}")
+
+
+def bench_report(args) -> None:
+    """Compare the set-based financial report with the legacy N+1 report."""
+    build_database(args.items, args.sales)
+    as_of_date = "2025-03-15"
+    # Repeated calls would otherwise time point-in-time cache hits, not the queries
+    ps.point_in_time_cache.enabled = False
+
+    legacy = legacy_generate_financial_report(as_of_date)
+    current = ps.generate_financial_report(as_of_date)
+    assert np.isclose(legacy["cash_balance"], current["cash_balance"])
+    assert np.isclose(legacy["inventory_value"], current["inventory_value"])
+    assert len(legacy["inventory_summary"]) == len(current["inventory_summary"])
+
+    legacy_s = time_call(lambda: legacy_generate_financial_report(as_of_date), args.repeat)
+    current_s = time_call(lambda: ps.generate_financial_report(as_of_date), args.repeat)
+    print(f"generate_financial_report ({args.items} extra items, {args.sales} sales)")
+    print(f"  legacy N+1:  {legacy_s * 1000:10.2f} ms")
+    print(f"  set-based:   {current_s * 1000:10.2f} ms")
+    print(f"  speedup:     {legacy_s / current_s:10.1f}x")
+    ps.point_in_time_cache.enabled = True
+
+
+def bench_writes(args) -> None:
+    """Compare per-row, bulk and write-behind buffered transaction writes."""
+    build_database(args.items, 0)
+    rng = np.random.default_rng(7)
+    names = pd.read_sql("SELECT item_name FROM inventory", ps.db_engine)["item_name"].to_numpy()
+
+    def make_batch():
+        return [
+            {
+                "item_name": names[i],
+                "transaction_type": "sales",
+                "quantity": 1,
+                "price": 1.0,
+                "date": "2025-02-01",
+            }
+            for i in rng.integers(0, len(names), args.rows)
+        ]
+
+    def per_row():
+        for transaction in make_batch():
+            ps.create_transaction(**transaction)
+
+    def bulk():
+        ps.create_transactions_bulk(make_batch())
+
+    def buffered():
+        with ps.TransactionWriteBuffer(max_batch=args.batch) as buffer:
+            for transaction in make_batch():
+                buffer.add(**transaction)
+
+    print(f"transaction writes ({args.rows} sales per run)")
+    for label, fn in [("create_transaction", per_row), ("bulk", bulk), (f"buffer/{args.batch}", buffered)]:
+        seconds = time_call(fn, args.repeat)
+        print(f"  {label:20s} {args.rows / seconds:12,.0f} rows/s")
+
+
+def add_synthetic_quotes(num_quotes: int, seed: int = 137) -> None:
+    """Append `num_quotes` synthetic requests and quotes, then rebuild the search index."""
+    rng = np.random.default_rng(seed)
+    names = np.array([item["item_name"].lower() for item in ps.paper_supplies])
+    unit_prices = np.array([item["unit_price"] for item in ps.paper_supplies])
+    sizes = np.array(["small", "medium", "large"])
+    events = np.array(["ceremony", "conference", "party", "meeting", "exhibition"])
+
+    with ps.db_engine.connect() as conn:
+        start = conn.exec_driver_sql(
+            "SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM quote_requests),"
+            " (SELECT COALESCE(MAX(request_id), 0) FROM quotes))"
+        ).scalar_one() + 1
+    ids = np.arange(start, start + num_quotes)
+    picked = rng.integers(0, len(names), num_quotes)
+    first = names[picked]
+    # Quoted unit prices scatter around the catalog price
+    price = pd.Series(np.round(unit_prices[picked] * rng.uniform(0.8, 1.2, num_quotes), 2)).map("{:.2f}".format)
+    second = names[rng.integers(0, len(names), num_quotes)]
+    qty = rng.integers(1, 50, num_quotes) * 10
+    size = sizes[rng.integers(0, len(sizes), num_quotes)]
+    event = events[rng.integers(0, len(events), num_quotes)]
+
+    requests = pd.DataFrame({
+        "mood": "calm",
+        "job": "office manager",
+        "need_size": size,
+        "event": event,
+        "response": pd.Series(qty).astype(str) + " sheets of " + first + " and some " + second
+                    + " for our " + event + ".",
+        "id": ids,
+    })
+    quotes = pd.DataFrame({
+        "request_id": ids,
+        "total_amount": qty // 5,
+        "quote_explanation": "Thank you for your order of " + pd.Series(qty).astype(str) + " sheets of "
+                             + first + " at $" + price + " each. We applied a bulk discount to the "
+                             + second + ".",
+        "order_date": "2025-01-01T00:00:00",
+        "job_type": "office manager",
+        "order_size": size,
+        "event_type": event,
+    })
+    requests.to_sql("quote_requests", ps.db_engine, if_exists="append", index=False, chunksize=50000)
+    quotes.to_sql("quotes", ps.db_engine, if_exists="append", index=False, chunksize=50000)
+
+
+def bench_search(args) -> None:
+    """Compare FTS5/BM25 quote search with the LIKE scan at a large quote history."""
+    build_database(0, 0)
+    with ps.db_engine.begin() as conn:
+        # Bulk-load first and index once, rather than through the sync triggers
+        ps.drop_quote_search_index(conn)
+    add_synthetic_quotes(args.quotes)
+    start = time.perf_counter()
+    ps.rebuild_quote_search_index(ps.db_engine)
+    build_s = time.perf_counter() - start
+
+    print(f"search_quote_history ({args.quotes:,} synthetic quotes, index build {build_s:.1f} s)")
+    for terms in (["cardstock"], ["glossy paper", "party"], ["washi tape"]):
+        fts_s = time_call(lambda: ps.search_quote_history(terms), args.repeat)
+        like_s = time_call(lambda: ps._search_quote_history_like(terms), args.repeat)
+        print(f"  {str(terms):28s} LIKE {like_s * 1000:9.2f} ms   FTS5 {fts_s * 1000:9.2f} ms"
+              f"   speedup {like_s / fts_s:7.1f}x")
+
+
+def load_sample_requests(copies: int = 1) -> pd.DataFrame:
+    """Load quote_requests_sample.csv, repeated `copies` times, sorted by request date."""
+    requests = pd.read_csv("quote_requests_sample.csv")
+    requests["request_date"] = pd.to_datetime(requests["request_date"], format="%m/%d/%y")
+    requests = pd.concat([requests] * copies, ignore_index=True)
+    return requests.sort_values("request_date", kind="stable")
+
+
+def bench_pipeline(args) -> None:
+    """
+    Throughput of the request pipeline as a function of worker count.
+
+    `--latency` adds a simulated network wait to every orchestrator call, standing in
+    for the model round trip that worker threads are meant to overlap.
+    """
+    requests = load_sample_requests(args.copies)
+    call_multi_agent_system = ps.call_multi_agent_system
+    if args.latency:
+        def call_with_latency(request):
+            time.sleep(args.latency)
+            return call_multi_agent_system(request)
+        ps.call_multi_agent_system = call_with_latency
+
+    print(f"process_quote_requests ({len(requests)} requests, {args.latency * 1000:.0f} ms simulated latency)")
+    for workers in args.workers:
+        build_database(0, 0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run = ps.process_quote_requests(requests, workers=workers)
+            elapsed = time.perf_counter() - start
+
+        # The atomic sale must never drive any item below zero
+        oversold = pd.read_sql("SELECT COUNT(*) AS n FROM stock_ledger WHERE balance < 0", ps.db_engine)["n"].iloc[0]
+        assert oversold == 0, f"{oversold} ledger checkpoints below zero"
+        print(f"  workers={workers:<3d} {len(requests) / elapsed:10.1f} requests/s"
+              f"   fulfilled {run['fulfilled_orders']}/{len(requests)}")
+    ps.call_multi_agent_system = call_multi_agent_system
+
+
+def bench_cache(args) -> None:
+    """
+    Model calls and run time of repeated runs over the sample requests with the
+    response cache, against the local stub server.
+    """
+    requests = load_sample_requests()
+    server = start_stub_server(latency=args.latency)
+    base_url = os.environ.get("OPENAI_BASE_URL")
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    response_cache = ps._response_cache
+    ps._response_cache = ps.ResponseCache(os.path.join(tempfile.mkdtemp(prefix="munder_cache_"), "cache.db"))
+
+    print(f"Model replies for {len(requests)} requests ({args.latency * 1000:.0f} ms stub latency)")
+    runs = [("no cache", True)] + [(f"cached pass {n + 1}", False) for n in range(args.passes)]
+    for label, bypass in runs:
+        build_database(0, 0)
+        calls_before = server.requests_served
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            ps.process_quote_requests(requests, use_model=True, bypass_cache=bypass)
+            elapsed = time.perf_counter() - start
+        print(f"  {label:<16} {elapsed:8.2f} s   {server.requests_served - calls_before:4d} model calls")
+
+    stats = ps._response_cache.stats()
+    print(f"  hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses, "
+          f"{stats['entries']} entries)")
+    ps._response_cache = response_cache
+    if base_url is None:
+        del os.environ["OPENAI_BASE_URL"]
+    else:
+        os.environ["OPENAI_BASE_URL"] = base_url
+    server.shutdown()
+
+
+def bench_models(args) -> None:
+    """
+    Throughput of model calls against the local stub server: one synchronous call
+    at a time versus `AsyncModelBatcher` at several concurrency limits.
+
+    A share of the prompts are duplicates, which the batcher coalesces into one
+    call; the response cache is bypassed so every other prompt reaches the stub.
+    """
+    server = start_stub_server(latency=args.latency, error_rate=args.error_rate)
+    rng = np.random.default_rng(137)
+    unique = max(1, int(args.requests * (1 - args.duplicates)))
+    prompts = [f"Quote request {i}: 500 sheets of A4 paper" for i in rng.integers(0, unique, args.requests)]
+    cache = ps.ResponseCache(os.path.join(tempfile.mkdtemp(prefix="munder_cache_"), "cache.db"))
+
+    print(f"Model calls via {server.base_url} ({len(prompts)} requests, {len(set(prompts))} unique, "
+          f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.0%} errors)")
+
+    client = ps.openai.OpenAI(api_key="stub", base_url=server.base_url, max_retries=args.max_retries)
+    sequential = prompts[: max(1, len(prompts) // 10)]
+    start = time.perf_counter()
+    for prompt in sequential:
+        ps.call_model(prompt, client=client, cache=cache, bypass_cache=True)
+    elapsed = time.perf_counter() - start
+    print(f"  {'sequential':<16} {len(sequential) / elapsed:10.1f} requests/s   ({len(sequential)} requests)")
+
+    for concurrency in args.concurrency:
+        served = server.requests_served
+        server.max_in_flight = 0
+        async_client = ps.openai.AsyncOpenAI(api_key="stub", base_url=server.base_url, max_retries=0)
+        batcher = ps.AsyncModelBatcher(max_concurrency=concurrency, max_retries=args.max_retries,
+                                       base_delay=0.05, client=async_client, cache=cache)
+        async def run_batch():
+            try:
+                return await batcher.gather(prompts, bypass_cache=True)
+            finally:
+                await async_client.close()
+
+        start = time.perf_counter()
+        replies = asyncio.run(run_batch())
+        elapsed = time.perf_counter() - start
+        failed = sum(isinstance(reply, Exception) for reply in replies)
+        print(f"  {f'concurrency={concurrency}':<16} {len(prompts) / elapsed:10.1f} requests/s"
+              f"   {server.requests_served - served} HTTP calls, {batcher.coalesced} coalesced,"
+              f" {batcher.retries} retries, {failed} failed, peak {server.max_in_flight} in flight")
+    server.shutdown()
+
+
+def bench_metrics(args) -> None:
+    """Per-call cost of the instrumentation with metrics off and on."""
+    build_database(args.items, args.sales)
+    calls = {
+        "get_supplier_delivery_date": lambda: ps.get_supplier_delivery_date("2025-02-01", 500),
+        "get_stock_level": lambda: ps.get_stock_level("A4 paper", "2025-02-01"),
+    }
+    print(f"Instrumentation overhead ({args.calls:,} calls each, best of {args.repeat})")
+    for name, fn in calls.items():
+        timings = {}
+        for enabled in (False, True):
+            ps.enable_metrics(enabled)
+
+            def run():
+                for _ in range(args.calls):
+                    fn()
+
+            timings[enabled] = time_call(run, args.repeat) / args.calls * 1e6
+        print(f"  {name:<28} off {timings[False]:9.2f} us   on {timings[True]:9.2f} us"
+              f"   ({timings[True] - timings[False]:+.2f} us per call)")
+    ps.enable_metrics(False)
+
+
+def bench_pricing(args) -> None:
+    """Pricing index build, incremental refresh and lookup, against quoting from search results."""
+    build_database(0, 0)
+    with ps.db_engine.begin() as conn:
+        ps.drop_quote_search_index(conn)
+    add_synthetic_quotes(args.quotes)
+    ps.rebuild_quote_search_index(ps.db_engine)
+
+    start = time.perf_counter()
+    index = ps.PricingIndex(ps.db_engine)
+    lines = index.refresh()
+    build_s = time.perf_counter() - start
+    add_synthetic_quotes(args.new_quotes, seed=7)
+    start = time.perf_counter()
+    new_lines = index.refresh()
+    refresh_s = time.perf_counter() - start
+
+    items = [item["item_name"] for item in ps.paper_supplies]
+    lookup_s = time_call(lambda: [index.unit_price(item, "large") for item in items], args.repeat)
+    search_s = time_call(lambda: [ps.search_quote_history([item]) for item in items], args.repeat)
+    print(f"PricingIndex ({args.quotes:,} quotes)")
+    print(f"  build          {build_s:10.2f} s   {lines:,} priced lines, {lines / build_s:,.0f} lines/s")
+    print(f"  refresh        {refresh_s:10.2f} s   {new_lines:,} lines from {args.new_quotes:,} new quotes")
+    print(f"  lookup         {lookup_s / len(items) * 1e6:10.2f} us per item")
+    print(f"  history search {search_s / len(items) * 1e6:10.2f} us per item (previous quoting path)")
+
+
+def bench_catalog(args) -> None:
+    """Catalog build and price lookups, against the per-call inventory query it replaces."""
+    build_database(args.items, 0)
+
+    start = time.perf_counter()
+    catalog = ps.Catalog()
+    build_s = time.perf_counter() - start
+
+    names = [item.item_name for item in catalog.items if item.in_inventory]
+    lookup_s = time_call(lambda: [catalog.unit_price(name, stocked_only=True) for name in names], args.repeat)
+    query = "SELECT unit_price FROM inventory WHERE item_name = :item_name"
+    query_s = time_call(
+        lambda: [pd.read_sql(query, ps.db_engine, params={"item_name": name}) for name in names], args.repeat
+    )
+    print(f"Catalog ({len(catalog):,} SKUs, {len(names):,} stocked)")
+    print(f"  build          {build_s * 1000:10.2f} ms")
+    print(f"  price lookup   {lookup_s / len(names) * 1e6:10.2f} us per item")
+    print(f"  inventory SQL  {query_s / len(names) * 1e6:10.2f} us per item (previous price path)")
+
+
+def bench_orders(args) -> None:
+    """Multi-line orders: one transaction per order against a stock check, price and commit per line."""
+    build_database(args.items, 0)
+    catalog = ps.get_catalog(refresh=True)
+    names = [item.item_name for item in catalog.items if item.in_inventory]
+    rng = np.random.default_rng(11)
+    orders = [
+        [{"item_name": name, "quantity": 1} for name in rng.choice(names, args.lines, replace=False)]
+        for _ in range(args.orders)
+    ]
+
+    def per_line(order):
+        for line in order:
+            ps.get_stock_level(line["item_name"], "2025-06-01")
+            unit_price = catalog.unit_price(line["item_name"], stocked_only=True)
+            ps.create_sale_if_in_stock(line["item_name"], line["quantity"], line["quantity"] * unit_price, "2025-06-01")
+
+    ps.enable_metrics()
+    print(f"{args.orders:,} orders of {args.lines} lines")
+    for name, fn in [
+        ("per line", per_line),
+        ("process_order", lambda order: ps.process_order(order, "2025-06-01")),
+    ]:
+        ps.metrics.reset()
+        start = time.perf_counter()
+        for order in orders:
+            fn(order)
+        seconds = time.perf_counter() - start
+        queries = ps.metrics_snapshot()["sql"]["queries"]
+        print(f"  {name:<14} {seconds / args.orders * 1000:8.2f} ms per order   {queries / args.orders:6.1f} queries per order")
+    ps.enable_metrics(False)
+
+
+def legacy_restock(as_of_date: str) -> int:
+    """Per-item restocking: a stock query, a cash check and a commit for every item below threshold."""
+    catalog = ps.get_catalog()
+    ordered = 0
+    for item in catalog.items:
+        if not item.in_inventory:
+            continue
+        stock = int(ps.get_stock_level(item.item_name, as_of_date)["current_stock"].iloc[0])
+        if stock >= item.min_stock_level:
+            continue
+        quantity = item.min_stock_level * 2 - stock
+        if quantity * item.unit_price > ps.get_cash_balance(as_of_date):
+            continue
+        delivery_date = ps.get_supplier_delivery_date(as_of_date, quantity)
+        ps.create_transaction(item.item_name, "stock_orders", quantity, quantity * item.unit_price, delivery_date)
+        ordered += 1
+    return ordered
+
+
+def bench_restock(args) -> None:
+    """Restock planning and ordering: one vectorized pass and bulk insert, against a per-item loop."""
+    print(f"Restocking {args.items:,} synthetic items after {args.sales:,} sales")
+    build_database(args.items, args.sales)
+    start = time.perf_counter()
+    ordered = legacy_restock("2025-04-01")
+    print(f"  per item        {time.perf_counter() - start:10.3f} s   {ordered:,} orders")
+
+    build_database(args.items, args.sales)
+    ps.get_catalog()
+    ps.point_in_time_cache.clear()
+    start = time.perf_counter()
+    plan = ps.restock_inventory("2025-04-01")
+    print(f"  restock         {time.perf_counter() - start:10.3f} s   {int(plan['funded'].sum()):,} orders")
+    def plan_cold(_):
+        ps.point_in_time_cache.clear()
+        ps.plan_restock("2025-04-01")
+    timings = sample_calls(plan_cold, args.repeat)
+    print(f"  replan          {timings['median_ms']:10.2f} ms median, {timings['p95_ms']:.2f} ms p95 (nothing left to order)")
+
+
+def bench_timeseries(args) -> None:
+    """Daily financials over a range: one generate_financial_timeseries call against a report per day."""
+    build_database(args.items, args.sales)
+    dates = pd.date_range("2025-01-01", periods=args.days, freq="D").strftime("%Y-%m-%d")
+    print(f"{args.days} daily points, {args.items:,} items, {args.sales:,} sales")
+
+    ps.point_in_time_cache.clear()
+    start = time.perf_counter()
+    for date in dates:
+        ps.generate_financial_report(date)
+    print(f"  report per day  {time.perf_counter() - start:10.3f} s")
+
+    timings = sample_calls(lambda _: ps.generate_financial_timeseries(dates[0], dates[-1]), args.repeat)
+    print(f"  timeseries      {timings['median_ms'] / 1000:10.3f} s")
+
+
+def bench_ledger(args) -> None:
+    """A what-if simulation step loop on the SQLite ledger against an in-memory copy of it."""
+    build_database(args.items, args.sales)
+    start = time.perf_counter()
+    memory = ps.MemoryLedger.from_engine(ps.db_engine)
+    load_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(7)
+    names = [name for name, _, _, _ in memory.inventory_items()]
+    picks = rng.choice(names, args.steps)
+    dates = pd.date_range("2025-04-01", periods=args.steps, freq="min").strftime("%Y-%m-%dT%H:%M:%S")
+
+    def simulate() -> int:
+        sold = 0
+        for step, (name, date) in enumerate(zip(picks, dates)):
+            ps.get_stock_level(name, date)
+            sold += ps.create_sale_if_in_stock(name, 1, 1.0, date) is not None
+            ps.get_cash_balance(date)
+            if args.report_every and step % args.report_every == 0:
+                ps.generate_financial_report(date)
+        return sold
+
+    # Every step writes, so the point-in-time cache would only add invalidation work
+    ps.point_in_time_cache.enabled = False
+    print(f"{args.steps:,} simulation steps, {args.items:,} items, {args.sales:,} sales"
+          f" (memory ledger loaded in {load_s:.2f} s)")
+    timings = {}
+    for name, ledger in [("memory", memory), ("sqlite", None)]:
+        ps.use_ledger(ledger)
+        # The reports' sales leaderboard is built once per ledger; time it apart from the steps
+        start = time.perf_counter()
+        ps.get_leaderboard()
+        build_s = time.perf_counter() - start
+        # Keep the collector from rescanning the setup's objects in the middle of the loop
+        gc.collect()
+        gc.freeze()
+        start = time.perf_counter()
+        sold = simulate()
+        timings[name] = time.perf_counter() - start
+        gc.unfreeze()
+        print(f"  {name:<8} {timings[name]:8.2f} s   {args.steps / timings[name]:10,.0f} steps/s   {sold:,} sales"
+              f"   (leaderboard built in {build_s:.2f} s)")
+    ps.use_ledger(None)
+    ps.point_in_time_cache.enabled = True
+    print(f"  speedup  {timings['sqlite'] / timings['memory']:8.1f}x")
+
+
+def bench_sweep(args) -> None:
+    """Scenario sweep throughput by worker process count, each scenario on its own database."""
+    seeds = list(range(args.scenarios))
+    print(f"{args.scenarios} scenarios (seeds 0-{args.scenarios - 1}, coverage 0.4), {os.cpu_count()} CPUs")
+    for workers in args.workers:
+        start = time.perf_counter()
+        sweep = ps.run_sweep(seeds, workers=workers, memory_ledger=args.memory_ledger)
+        seconds = time.perf_counter() - start
+        print(f"  {workers:>3} workers  {seconds:8.2f} s   {len(sweep) / seconds:6.2f} scenarios/s"
+              f"   mean fulfillment {sweep['fulfillment_rate'].mean():.0%}")
+
+
+LEGACY_TOP_SELLERS_SQL = """
+    SELECT item_name, SUM(units) AS total_units, SUM(price) AS total_revenue
+    FROM transactions
+    WHERE transaction_type = 'sales' AND transaction_ts <= :as_of_ts
+    GROUP BY item_name
+    ORDER BY total_revenue DESC
+    LIMIT :k
+"""
+
+
+def bench_leaderboard(args) -> None:
+    """Top-k sellers: the incrementally maintained leaderboard against a GROUP BY over every sale."""
+    build_database(args.items, args.sales)
+    names = pd.read_sql("SELECT item_name FROM inventory", ps.db_engine)["item_name"].to_numpy()
+    rng = np.random.default_rng(3)
+    print(f"Top {args.k} sellers, {args.items:,} items, {args.sales:,} sales")
+
+    def group_by(as_of_date: str):
+        return pd.read_sql(LEGACY_TOP_SELLERS_SQL, ps.db_engine,
+                           params={"as_of_ts": ps._to_timestamp(as_of_date), "k": args.k})
+
+    start = time.perf_counter()
+    leaderboard = ps.get_leaderboard()
+    print(f"  leaderboard build      {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    group_ms = sample_calls(lambda _: group_by("2025-12-31"), args.repeat)["median_ms"]
+    latest_ms = sample_calls(lambda _: leaderboard.top(args.k), args.repeat)["median_ms"]
+    first_ms = sample_calls(lambda i: leaderboard.top(args.k, f"2025-02-{i % 28 + 1:02d}"), min(args.repeat, 28))["median_ms"]
+    cached_ms = sample_calls(lambda i: leaderboard.top(args.k, "2025-02-01"), args.repeat)["median_ms"]
+    print(f"  GROUP BY per read      {group_ms:10.3f} ms")
+    print(f"  top-k, latest          {latest_ms:10.4f} ms")
+    print(f"  top-k, past date       {first_ms:10.3f} ms first read, {cached_ms:.4f} ms cached")
+
+    # A sale followed by a leaderboard read, as in a report after each order
+    for label, read in [("sale + GROUP BY", lambda: group_by("2025-12-31")), ("sale + top-k", lambda: leaderboard.top(args.k))]:
+        picks = rng.choice(names, args.steps)
+        start = time.perf_counter()
+        for name in picks:
+            ps.create_transaction(name, "sales", 1, 1.0, "2025-06-01")
+            read()
+        print(f"  {label:<22} {(time.perf_counter() - start) / args.steps * 1000:10.3f} ms per step")
+
+
+def legacy_load_quotes(engine, path: str) -> None:
+    """The previous quotes loader: whole-file read and per-row `.apply` metadata parsing."""
+    quotes_df = pd.read_csv(path)
+    quotes_df["request_id"] = range(1, len(quotes_df) + 1)
+    quotes_df["order_date"] = "2025-01-01T00:00:00"
+    quotes_df["request_metadata"] = quotes_df["request_metadata"].apply(
+        lambda x: ast.literal_eval(x) if isinstance(x, str) else x
+    )
+    quotes_df["job_type"] = quotes_df["request_metadata"].apply(lambda x: x.get("job_type", ""))
+    quotes_df["order_size"] = quotes_df["request_metadata"].apply(lambda x: x.get("order_size", ""))
+    quotes_df["event_type"] = quotes_df["request_metadata"].apply(lambda x: x.get("event_type", ""))
+    quotes_df = quotes_df[ps.QUOTES_COLUMNS]
+    quotes_df.to_sql("quotes", engine, if_exists="replace", index=False)
+
+
+def bench_init(args) -> None:
+    """init_database on a quote dump `--copies` times the size of quotes.csv, against the previous loader."""
+    workdir = tempfile.mkdtemp(prefix="munder_init_")
+    quotes_path = os.path.join(workdir, "quotes.csv")
+    requests_path = os.path.join(workdir, "quote_requests.csv")
+    pd.concat([pd.read_csv("quotes.csv")] * args.copies, ignore_index=True).to_csv(quotes_path, index=False)
+    pd.concat([pd.read_csv("quote_requests.csv")] * args.copies, ignore_index=True).to_csv(requests_path, index=False)
+
+    engine = ps.create_db_engine(f"sqlite:///{os.path.join(workdir, 'legacy.db')}")
+    start = time.perf_counter()
+    legacy_load_quotes(engine, quotes_path)
+    legacy_s = time.perf_counter() - start
+
+    engine = ps.create_db_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    ps.db_engine = engine
+    start = time.perf_counter()
+    ps.init_database(engine, quote_requests_path=requests_path, quotes_path=quotes_path, chunksize=args.chunksize)
+    total_s = time.perf_counter() - start
+
+    quotes = ps.last_load_stats["quotes"]
+    print(f"init_database ({quotes['rows']:,} quotes, {ps.last_load_stats['quote_requests']['rows']:,} requests,"
+          f" chunks of {args.chunksize:,})")
+    print(f"  previous quotes loader {quotes['rows'] / legacy_s:12,.0f} rows/s")
+    for table, stats in ps.last_load_stats.items():
+        print(f"  {table:<22} {stats['rows_per_s']:12,.0f} rows/s")
+    print(f"  total init_database    {total_s:12.2f} s (including search index and ledgers)")
+
+
+def bench_asof(args) -> None:
+    """The request pipeline and repeated reports with the point-in-time cache off and on."""
+    requests = load_sample_requests(args.copies)
+    print(f"Point-in-time cache ({args.items} extra items, {args.sales:,} sales, {len(requests)} requests)")
+    for enabled in (False, True):
+        build_database(args.items, args.sales)
+        ps.point_in_time_cache.enabled = enabled
+        ps.point_in_time_cache.clear()
+        before = ps.point_in_time_cache.stats()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            ps.process_quote_requests(requests, reconcile_every=5)
+            pipeline_s = time.perf_counter() - start
+        report_s = time_call(lambda: ps.generate_financial_report("2025-03-15"), args.repeat)
+        stats = ps.point_in_time_cache.stats()
+        hits, misses = stats["hits"] - before["hits"], stats["misses"] - before["misses"]
+        print(f"  cache {'on ' if enabled else 'off'}   pipeline {pipeline_s:8.2f} s   repeated report"
+              f" {report_s * 1000:9.3f} ms   {hits} hits / {misses} misses")
+    ps.point_in_time_cache.enabled = True
+
+
+def bench_matcher(args) -> None:
+    """Throughput of the compiled catalog matcher on the historical quote requests."""
+    start = time.perf_counter()
+    matcher = ps.CatalogMatcher(ps.paper_supplies)
+    compile_s = time.perf_counter() - start
+
+    texts = pd.read_csv("quote_requests.csv")["response"].tolist() * args.copies
+    seconds = time_call(lambda: matcher.match_many(texts), args.repeat)
+    mentions = sum(len(found) for found in matcher.match_many(texts))
+    print(f"CatalogMatcher.match_many ({len(texts):,} requests, compiled in {compile_s * 1000:.1f} ms)")
+    print(f"  {len(texts) / seconds:12,.0f} requests/s   {mentions / len(texts):.2f} items per request")
+
+
+# Cold-start scenarios, each timed in a fresh interpreter from just before `import project_starter`
+STARTUP_SCENARIOS = {
+    "import only": "",
+    "delivery date + catalog": (
+        "ps.get_supplier_delivery_date('2025-04-01', 500)\n"
+        "ps.get_catalog_matcher().match('500 reams of A4 paper')"
+    ),
+    "engine + client + pandas": (
+        "ps.get_db_engine().connect().close()\n"
+        "ps.get_openai_client()\n"
+        "ps.pd.DataFrame()"
+    ),
+}
+
+STARTUP_SCRIPT = """
+import contextlib, io, time
+start = time.perf_counter()
+import project_starter as ps
+from stub_server import start_stub_server
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+print(time.perf_counter() - start)
+"""
+
+
+def bench_startup(args) -> None:
+    """Cold-start time of project_starter for short-lived worker processes."""
+    env = dict(os.environ, UDACITY_OPENAI_API_KEY=os.environ.get("UDACITY_OPENAI_API_KEY", "benchmark"))
+    print(f"Cold start in a fresh interpreter (median of {args.repeat})")
+    for name, body in STARTUP_SCENARIOS.items():
+        indented = "\n".join("    " + line for line in (body or "pass").splitlines())
+        script = STARTUP_SCRIPT.format(body=indented)
+        timings = [
+            float(subprocess.run([sys.executable, "-c", script], env=env, check=True,
+                                 capture_output=True, text=True).stdout.split()[-1])
+            for _ in range(args.repeat)
+        ]
+        print(f"  {name:<26} {statistics.median(timings) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Munder Difflin benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    report = subparsers.add_parser("report", help="financial report: set-based vs N+1")
+    report.add_argument("--items", type=int, default=1000)
+    report.add_argument("--sales", type=int, default=20000)
+    report.add_argument("--repeat", type=int, default=5)
+    report.set_defaults(func=bench_report)
+
+    writes = subparsers.add_parser("writes", help="transaction writes: per-row vs bulk vs buffered")
+    writes.add_argument("--items", type=int, default=100)
+    writes.add_argument("--rows", type=int, default=2000)
+    writes.add_argument("--batch", type=int, default=500)
+    writes.add_argument("--repeat", type=int, default=3)
+    writes.set_defaults(func=bench_writes)
+
+    search = subparsers.add_parser("search", help="quote search: FTS5 vs LIKE")
+    search.add_argument("--quotes", type=int, default=1_000_000)
+    search.add_argument("--repeat", type=int, default=3)
+    search.set_defaults(func=bench_search)
+
+    pipeline = subparsers.add_parser("pipeline", help="request pipeline throughput vs worker count")
+    pipeline.add_argument("--copies", type=int, default=5, help="repetitions of the sample request set")
+    pipeline.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    pipeline.add_argument("--latency", type=float, default=0.0, help="simulated seconds per model call")
+    pipeline.set_defaults(func=bench_pipeline)
+
+    matcher = subparsers.add_parser("matcher", help="catalog matcher batch throughput")
+    matcher.add_argument("--copies", type=int, default=25, help="repetitions of quote_requests.csv")
+    matcher.add_argument("--repeat", type=int, default=3)
+    matcher.set_defaults(func=bench_matcher)
+
+    cache = subparsers.add_parser("cache", help="model calls saved by the response cache")
+    cache.add_argument("--passes", type=int, default=2, help="cached runs after the uncached one")
+    cache.add_argument("--latency", type=float, default=0.2, help="stub model latency in seconds")
+    cache.set_defaults(func=bench_cache)
+
+    models = subparsers.add_parser("models", help="async batched model calls vs sequential, via the stub server")
+    models.add_argument("--requests", type=int, default=200)
+    models.add_argument("--duplicates", type=float, default=0.25, help="share of prompts that repeat another")
+    models.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    models.add_argument("--latency", type=float, default=0.2, help="stub latency in seconds")
+    models.add_argument("--error-rate", type=float, default=0.0, help="share of stub responses that are 503s")
+    models.add_argument("--max-retries", type=int, default=4)
+    models.set_defaults(func=bench_models)
+
+    metrics = subparsers.add_parser("metrics", help="per-call cost of the instrumentation, off vs on")
+    metrics.add_argument("--items", type=int, default=100)
+    metrics.add_argument("--sales", type=int, default=10000)
+    metrics.add_argument("--calls", type=int, default=2000)
+    metrics.add_argument("--repeat", type=int, default=3)
+    metrics.set_defaults(func=bench_metrics)
+
+    pricing = subparsers.add_parser("pricing", help="pricing index build, refresh and lookup")
+    pricing.add_argument("--quotes", type=int, default=100000)
+    pricing.add_argument("--new-quotes", type=int, default=1000, help="quotes added before the incremental refresh")
+    pricing.add_argument("--repeat", type=int, default=3)
+    pricing.set_defaults(func=bench_pricing)
+
+    catalog = subparsers.add_parser("catalog", help="in-memory catalog price lookups vs inventory queries")
+    catalog.add_argument("--items", type=int, default=10000, help="synthetic items added to the inventory")
+    catalog.add_argument("--repeat", type=int, default=3)
+    catalog.set_defaults(func=bench_catalog)
+
+    orders = subparsers.add_parser("orders", help="multi-line orders in one transaction vs per line")
+    orders.add_argument("--items", type=int, default=1000, help="synthetic items added to the inventory")
+    orders.add_argument("--orders", type=int, default=200)
+    orders.add_argument("--lines", type=int, default=8, help="line items per order")
+    orders.set_defaults(func=bench_orders)
+
+    restock = subparsers.add_parser("restock", help="batched restock planner vs per-item restocking")
+    restock.add_argument("--items", type=int, default=2000, help="synthetic items added to the inventory")
+    restock.add_argument("--sales", type=int, default=1000000)
+    restock.add_argument("--repeat", type=int, default=10)
+    restock.set_defaults(func=bench_restock)
+
+    timeseries = subparsers.add_parser("timeseries", help="daily financial time series vs a report per day")
+    timeseries.add_argument("--items", type=int, default=1000, help="synthetic items added to the inventory")
+    timeseries.add_argument("--sales", type=int, default=200000)
+    timeseries.add_argument("--days", type=int, default=90)
+    timeseries.add_argument("--repeat", type=int, default=3)
+    timeseries.set_defaults(func=bench_timeseries)
+
+    ledger = subparsers.add_parser("ledger", help="simulation steps on the SQLite vs in-memory ledger")
+    ledger.add_argument("--items", type=int, default=1000, help="synthetic items added to the inventory")
+    ledger.add_argument("--sales", type=int, default=100000)
+    ledger.add_argument("--steps", type=int, default=2000)
+    ledger.add_argument("--report-every", type=int, default=50, help="steps between full reports (0 = never)")
+    ledger.set_defaults(func=bench_ledger)
+
+    sweep = subparsers.add_parser("sweep", help="scenario sweep throughput vs worker process count")
+    sweep.add_argument("--scenarios", type=int, default=16)
+    sweep.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    sweep.add_argument("--memory-ledger", action="store_true", help="run each scenario on a MemoryLedger")
+    sweep.set_defaults(func=bench_sweep)
+
+    leaderboard = subparsers.add_parser("leaderboard", help="incremental top-sellers leaderboard vs GROUP BY")
+    leaderboard.add_argument("--items", type=int, default=1000, help="synthetic items added to the inventory")
+    leaderboard.add_argument("--sales", type=int, default=100000)
+    leaderboard.add_argument("--k", type=int, default=5, help="leaderboard size")
+    leaderboard.add_argument("--steps", type=int, default=50, help="sale-then-read steps")
+    leaderboard.add_argument("--repeat", type=int, default=20)
+    leaderboard.set_defaults(func=bench_leaderboard)
+
+    init = subparsers.add_parser("init", help="chunked init_database loading vs the previous loader")
+    init.add_argument("--copies", type=int, default=5000, help="repetitions of quotes.csv and quote_requests.csv")
+    init.add_argument("--chunksize", type=int, default=50000)
+    init.set_defaults(func=bench_init)
+
+    asof = subparsers.add_parser("asof", help="point-in-time query cache off vs on")
+    asof.add_argument("--items", type=int, default=1000)
+    asof.add_argument("--sales", type=int, default=100000)
+    asof.add_argument("--copies", type=int, default=3, help="repetitions of the sample request set")
+    asof.add_argument("--repeat", type=int, default=5)
+    asof.set_defaults(func=bench_asof)
+
+    startup = subparsers.add_parser("startup", help="import and first-use time in a fresh interpreter")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    suite = subparsers.add_parser("suite", help="ledger/report/search timings over synthetic sizes, as JSON")
+    suite.add_argument("--skus", type=int, nargs="+", default=[1000, 10000], help="synthetic catalog sizes")
+    suite.add_argument("--transactions", type=int, nargs="+", default=[10000, 100000, 1000000],
+                       help="synthetic ledger sizes (up to 10,000,000)")
+    suite.add_argument("--quotes", type=int, default=100000, help="synthetic quote history size")
+    suite.add_argument("--repeat", type=int, default=20, help="timed calls per function")
+    suite.add_argument("--seed", type=int, default=137)
+    suite.add_argument("--output", help="write results as JSON to this file")
+    suite.add_argument("--compare", help="JSON results from an earlier run to compare medians against")
+    suite.add_argument("--threshold", type=float, default=0.25, help="slowdown that counts as a regression")
+    suite.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    # init_database reads the CSV inputs relative to the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint.
+
+Answers POST /v1/chat/completions with an OpenAI-shaped response that echoes the
+last message, after a configurable delay, so the model client path can be
+exercised and timed without network access or an API key. A fraction of
+requests can be made to fail with HTTP 503 to exercise retries.
+
+Usage:
+    python stub_server.py --port 8765 --latency 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python project_starter.py --use-model
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class StubChatServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stub's latency settings and request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0):
+        """
+        Args:
+            address (Tuple[str, int]): Host and port to bind; port 0 picks a free port.
+            latency (float, optional): Seconds to wait before answering. Default is 0.2.
+            jitter (float, optional): Extra uniformly random delay of up to this many seconds.
+            error_rate (float, optional): Fraction of requests answered with HTTP 503.
+        """
+        super().__init__(address, StubChatHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests_served = 0
+        self.errors_served = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to an OpenAI client, e.g. "http://127.0.0.1:8765/v1"."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    """Handles POST /v1/chat/completions for `StubChatServer`."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        server = self.server
+        with server._lock:
+            server._in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server._in_flight)
+        try:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+            failed = random.random() < server.error_rate
+        finally:
+            with server._lock:
+                server._in_flight -= 1
+                server.requests_served += 1
+                server.errors_served += failed
+
+        if failed:
+            self._send(503, {"error": {"message": "Stub overloaded", "type": "server_error"}})
+            return
+
+        messages = body.get("messages") or [{"content": ""}]
+        content = f"[stub] {messages[-1].get('content', '')}"
+        self._send(200, {
+            "id": f"chatcmpl-stub-{server.requests_served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _send(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+def start_stub_server(
+    latency: float = 0.2,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> StubChatServer:
+    """
+    Start a stub server on a background thread.
+
+    Call `shutdown()` on the returned server to stop it.
+
+    Returns:
+        StubChatServer: The running server; `base_url` gives the endpoint for clients.
+    """
+    server = StubChatServer((host, port), latency=latency, jitter=jitter, error_rate=error_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    args = parser.parse_args()
+
+    server = StubChatServer((args.host, args.port), args.latency, args.jitter, args.error_rate)
+    print(f"Stub chat completions endpoint at {server.base_url}/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The tests import project_starter from the repository root and never call the model API
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("UDACITY_OPENAI_API_KEY", "test")
@@ -0,0 +1,127 @@
+"""MemoryLedger against SQLiteLedger on the same random sequence of writes."""
+import math
+import os
+import random
+
+import pytest
+
+import project_starter as ps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def ledgers(tmp_path, monkeypatch):
+    """A fresh sample database and an in-memory copy of it; yields (sqlite, memory)."""
+    engine = ps.create_db_engine(f"sqlite:///{tmp_path / 'ledger.db'}")
+    monkeypatch.setattr(ps, "db_engine", engine)
+    ps.init_database(
+        engine,
+        quote_requests_path=os.path.join(ROOT, "quote_requests.csv"),
+        quotes_path=os.path.join(ROOT, "quotes.csv"),
+    )
+    memory = ps.MemoryLedger.from_engine(engine)
+    sqlite = ps.get_ledger()
+    yield sqlite, memory
+    ps.use_ledger(None)
+    for ledger in (sqlite, memory):
+        ps._forget_leaderboard(ledger.key)
+    engine.dispose()
+
+
+def _random_date(rng: random.Random) -> str:
+    """A date anywhere in the first third of 2025, so most writes land before earlier ones."""
+    return f"2025-{rng.randint(1, 4):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+
+
+def _random_writes(rng: random.Random, names: list, count: int) -> list:
+    """`count` ledger calls as (function, args) pairs, each dated at random."""
+    writes = []
+    for _ in range(count):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.3:
+            units = rng.randint(1, 500)
+            writes.append((ps.create_transaction, (name, "stock_orders", units, units * 0.05, _random_date(rng))))
+        elif kind < 0.6:
+            units = rng.randint(1, 300)
+            writes.append((ps.create_sale_if_in_stock, (name, units, units * 0.25, _random_date(rng))))
+        elif kind < 0.8:
+            units = rng.randint(1, 100)
+            writes.append((ps.create_transaction, (name, "sales", units, units * 0.3, _random_date(rng))))
+        else:
+            lines = [{"item_name": item, "quantity": rng.randint(1, 200)} for item in rng.sample(names, 3)]
+            writes.append((ps.process_order, (lines, _random_date(rng), rng.random() < 0.5)))
+    return writes
+
+
+def _assert_close(actual, expected, path="result"):
+    """Recursive equality with a relative tolerance for floats and NaN equal to NaN."""
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys(), path
+        for key in expected:
+            _assert_close(actual[key], expected[key], f"{path}[{key!r}]")
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            _assert_close(a, e, f"{path}[{i}]")
+    elif isinstance(expected, float):
+        assert (math.isnan(actual) and math.isnan(expected)) or actual == pytest.approx(expected, rel=1e-9, abs=1e-6), path
+    else:
+        assert actual == expected, path
+
+
+def test_memory_ledger_matches_sqlite_after_back_dated_writes(ledgers):
+    sqlite, memory = ledgers
+    rng = random.Random(23)
+    names = [name for name, _, _, _ in memory.inventory_items()]
+    writes = _random_writes(rng, names, 300)
+
+    # Build both leaderboards first, so the writes go through their incremental path
+    results = {}
+    for ledger in (sqlite, memory):
+        ps.use_ledger(ledger)
+        ps.get_leaderboard()
+        results[ledger.key] = [fn(*args) for fn, args in writes]
+    # Same sales accepted and the same orders fulfilled, with the same transaction IDs
+    assert results[memory.key] == results[sqlite.key]
+
+    dates = ["2024-12-31T23:59:59", "2025-01-01T00:00:00"] + sorted(_random_date(rng) for _ in range(8))
+    dates += ["2025-04-28T23:59:00", "2025-06-01T00:00:00"]
+    answers = {}
+    for ledger in (sqlite, memory):
+        ps.use_ledger(ledger)
+        leaderboard = ps.get_leaderboard()
+        answers[ledger.key] = {
+            date: {
+                "cash": ps.get_cash_balance(date),
+                "inventory": ps.get_all_inventory(date),
+                "stock": {name: int(ps.get_stock_level(name, date)["current_stock"].iloc[0]) for name in names[:5]},
+                "report": ps.generate_financial_report(date),
+                "top_revenue": leaderboard.top(10, date),
+                "top_units": leaderboard.top(10, date, by="units"),
+            }
+            for date in dates
+        }
+        answers[ledger.key]["latest"] = {"top_revenue": leaderboard.top(10), "top_units": leaderboard.top(10, by="units")}
+
+    _assert_close(answers[memory.key], answers[sqlite.key])
+
+
+def test_memory_leaderboard_rebuilt_after_writes_matches_sqlite(ledgers):
+    sqlite, memory = ledgers
+    rng = random.Random(5)
+    names = [name for name, _, _, _ in memory.inventory_items()]
+    writes = _random_writes(rng, names, 300)
+    for ledger in (sqlite, memory):
+        ps.use_ledger(ledger)
+        for fn, args in writes:
+            fn(*args)
+
+    # Built from each ledger's sales history rather than from the listener
+    tops = {}
+    for ledger in (sqlite, memory):
+        leaderboard = ps.SalesLeaderboard(ledger)
+        tops[ledger.key] = [leaderboard.top(10, by=by) for by in ps.LEADERBOARD_METRICS]
+        leaderboard.close()
+    _assert_close(tops[memory.key], tops[sqlite.key])
@@ -0,0 +1,140 @@
+"""ResponseCache and the model call paths in front of it, with fake clients and no network."""
+from types import SimpleNamespace
+
+import pytest
+
+import project_starter as ps
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeClient:
+    """Stands in for `openai.OpenAI`: numbers its replies and records every request."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **params):
+        self.requests.append({"model": model, "messages": messages, **params})
+        return _completion(f"reply {len(self.requests)}")
+
+
+class FakeAsyncClient(FakeClient):
+    """Stands in for `openai.AsyncOpenAI`."""
+
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+
+    async def _create(self, model, messages, **params):
+        return super()._create(model, messages, **params)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace `time.time` with a clock the test moves by hand, so access order is unambiguous."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(ps.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = ps.ResponseCache(str(tmp_path / f"cache{len(caches)}.db"), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.engine.dispose()
+
+
+def test_repeated_prompt_is_answered_from_the_cache(make_cache):
+    cache, client = make_cache(), FakeClient()
+    assert ps.call_model("How much is A4 paper?", client=client, cache=cache) == "reply 1"
+    assert ps.call_model("How much is A4 paper?", client=client, cache=cache) == "reply 1"
+    assert len(client.requests) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_key_ignores_whitespace_but_not_model_or_parameters(make_cache):
+    cache, client = make_cache(), FakeClient()
+    ps.call_model("Quote  500 sheets\nof cardstock", client=client, cache=cache)
+    assert ps.call_model(" Quote 500 sheets of cardstock ", client=client, cache=cache) == "reply 1"
+    assert ps.call_model("Quote 500 sheets of cardstock", client=client, cache=cache, temperature=0) == "reply 2"
+    assert ps.call_model("Quote 500 sheets of cardstock", model="gpt-4o", client=client, cache=cache) == "reply 3"
+    assert len(client.requests) == 3
+    assert client.requests[1]["temperature"] == 0
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_bypass_calls_the_model_and_leaves_entries_untouched(make_cache):
+    cache, client = make_cache(), FakeClient()
+    ps.call_model("Hello", client=client, cache=cache)
+    assert ps.call_model("Hello", client=client, cache=cache, bypass_cache=True) == "reply 2"
+    assert ps.call_model("Hello", client=client, cache=cache, bypass_cache=True) == "reply 3"
+    # The stored answer was neither read nor replaced
+    assert ps.call_model("Hello", client=client, cache=cache) == "reply 1"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bypassed"], stats["entries"]) == (1, 1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    cache = make_cache(max_entries=2)
+    cache.put("a", "m", "A")
+    clock[0] += 1
+    cache.put("b", "m", "B")
+    clock[0] += 1
+    assert cache.get("a") == "A"    # now more recent than "b"
+    clock[0] += 1
+    cache.put("c", "m", "C")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+    stats = cache.stats()
+    assert (stats["evictions"], stats["entries"]) == (1, 2)
+
+
+def test_expired_entry_is_a_miss_and_is_deleted(make_cache, clock):
+    cache, client = make_cache(ttl=60), FakeClient()
+    ps.call_model("Hello", client=client, cache=cache)
+    clock[0] += 59
+    assert ps.call_model("Hello", client=client, cache=cache) == "reply 1"
+    clock[0] += 2   # 61 s after the entry was written; reading it does not extend its life
+    assert cache.get(ps.ResponseCache.make_key(ps.DEFAULT_MODEL, [{"role": "user", "content": "Hello"}], {})) is None
+    assert cache.stats()["entries"] == 0
+    assert ps.call_model("Hello", client=client, cache=cache) == "reply 2"
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 3)
+
+
+def test_clear_removes_entries_and_resets_counters(make_cache):
+    cache, client = make_cache(), FakeClient()
+    ps.call_model("Hello", client=client, cache=cache)
+    ps.call_model("Hello", client=client, cache=cache)
+    ps.call_model("Hello", client=client, cache=cache, bypass_cache=True)
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "evictions": 0, "bypassed": 0, "entries": 0}
+
+
+def test_batcher_shares_the_cache_and_coalesces_identical_requests(make_cache):
+    cache, client = make_cache(), FakeAsyncClient()
+    ps.call_model("Cached", client=FakeClient(), cache=cache)
+    batcher = ps.AsyncModelBatcher(client=client, cache=cache)
+    assert batcher.run(["Cached", "New", "New", "Other"]) == ["reply 1", "reply 1", "reply 1", "reply 2"]
+    assert [request["messages"][0]["content"] for request in client.requests] == ["New", "Other"]
+    assert (batcher.api_calls, batcher.coalesced) == (2, 1)
+    # A caller-supplied client is left open, and the answers were stored
+    assert not client.closed
+    assert batcher.run(["New", "Other"], bypass_cache=True) == ["reply 3", "reply 4"]
+    assert batcher.run(["New", "Other"]) == ["reply 1", "reply 2"]
+    assert cache.stats()["bypassed"] == 2